@@ -7,7 +7,8 @@ import os.path
 import random
 import string
 import sys
-import traceback
+from functools import lru_cache
+from xml.sax.saxutils import escape, quoteattr
 
 from osc import conf
 from osc import oscerr
@@ -20,6 +21,7 @@ from osc.core import makeurl
 from osclib.cache import Cache
 from osclib.cache_manager import CacheManager
 from osclib.conf import Config
+from osclib.conf import str2bool
 from osclib.freeze_command import FreezeCommand
 from osclib.stagingapi import StagingAPI
 from osclib.core import attribute_value_save
@@ -28,6 +30,7 @@ from osclib.core import create_delete_request
 from osclib.memoize import memoize_session_reset
 
 from urllib.error import HTTPError, URLError
+from urllib.parse import quote
 
 # pointing to other docker container
 APIURL = 'http://api:3000'
@@ -36,12 +39,48 @@ PROJECT = 'openSUSE:Factory'
 OSCRC = '/tmp/.oscrc-test'
 OSCCOOKIEJAR = '/tmp/.osc_cookiejar-test'
 
+# same marker used by dist/ci/docker-compose-test.sh to run the tests without coverage
+WITHOUT_COVERAGE = os.path.exists(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.without-coverage'))
+
+# whether the request cache was already disabled, see disable_cache()
+cache_disabled = False
+
+def disable_cache():
+    """Disables the request cache, the TTLs break any reproducibility
+
+    Cache.init() sticks with the first initialization, so doing it once per process is enough.
+    """
+    global cache_disabled
+    if cache_disabled:
+        return
+
+    Cache.CACHE_DIR = None
+    Cache.PATTERNS = {}
+    Cache.init()
+    cache_disabled = True
+
+@lru_cache(maxsize=None)
+def meta_url(metatype, path_args):
+    """URL of the meta of a project ('prj') or package ('pkg') in the OBS instance
+
+    The URL of a given project or package never changes, so it is only built once.
+    """
+    return osc.core.make_meta_url(metatype, path_args, APIURL)
+
 class TestCase(unittest.TestCase):
     script = None
     script_apiurl = True
     script_debug = True
     script_debug_osc = True
 
+    # user the OSCRC file is currently written for
+    oscrc_user = None
+    # parsed OSCRC of each user, so switching back to a user does not read the file again
+    oscrc_parsers = {}
+    # whether the OBS instance was already checked to be reachable for this test class
+    obs_checked = False
+
     def setUp(self):
         if os.path.exists(OSCCOOKIEJAR):
             # Avoid stale cookiejar since local OBS may be completely reset.
@@ -50,7 +89,9 @@ class TestCase(unittest.TestCase):
         self.users = []
         self.osc_user('Admin')
         self.apiurl = conf.config['apiurl']
-        self.assertOBS()
+        if not self.obs_checked:
+            self.assertOBS()
+            type(self).obs_checked = True
 
     def tearDown(self):
         # Ensure admin user so that tearDown cleanup succeeds.
@@ -58,11 +99,13 @@ class TestCase(unittest.TestCase):
 
     def assertOBS(self):
         url = makeurl(self.apiurl, ['about'])
-        root = ET.parse(http_GET(url)).getroot()
+        root = ET.fromstring(http_GET(url).read())
         self.assertEqual(root.tag, 'about')
 
     @staticmethod
     def oscrc(userid):
+        if TestCase.oscrc_user == userid:
+            return
         with open(OSCRC, 'w+') as f:
             f.write('\n'.join([
                 '[general]',
@@ -76,6 +119,7 @@ class TestCase(unittest.TestCase):
                 'email = {}@example.com'.format(userid),
                 '',
             ]))
+        TestCase.oscrc_user = userid
 
     def osc_user(self, userid):
         print(f'setting osc user to {userid}')
@@ -88,19 +132,34 @@ class TestCase(unittest.TestCase):
 
     def osc_user_pop(self):
         self.users.pop()
-        self.osc_user(self.users.pop())
+        userid = self.users[-1]
+
+        # Nothing to do if the current config was parsed from OSCRC for that same user (other
+        # config files may have been loaded meanwhile, e.g. by StagingWorkflow).
+        if conf.get_configParser.__dict__.get('conffile') == OSCRC and self.oscrc_user == userid:
+            return
+
+        print(f'setting osc user to {userid}')
+        self.oscrc(userid)
+        self.oscParse()
 
     def oscParse(self):
         # Otherwise, will stick to first user for a given apiurl.
         conf._build_opener.last_opener = (None, None)
 
-        # Otherwise, will not re-parse same config file.
-        if 'cp' in conf.get_configParser.__dict__:
+        # Otherwise, will not re-parse same config file. The parser of a user seen before is
+        # reused since the content of the file is the same.
+        userid = self.users[-1]
+        if userid in self.oscrc_parsers:
+            conf.get_configParser.cp = self.oscrc_parsers[userid]
+            conf.get_configParser.conffile = OSCRC
+        elif 'cp' in conf.get_configParser.__dict__:
             del conf.get_configParser.cp
 
         conf.get_config(override_conffile=OSCRC,
                         override_no_keyring=True,
                         override_no_gnome_keyring=True)
+        self.oscrc_parsers[userid] = conf.get_configParser.cp
         os.environ['OSC_CONFIG'] = OSCRC
         os.environ['OSRT_DISABLE_CACHE'] = 'true'
 
@@ -111,9 +170,13 @@ class TestCase(unittest.TestCase):
             args.insert(1, '--debug')
         if self.script_debug_osc:
             args.insert(1, '--osc-debug')
-        args.insert(0, '-p')
-        args.insert(0, 'run')
-        args.insert(0, 'coverage')
+        if WITHOUT_COVERAGE:
+            # Spare the coverage startup cost when nothing collects its data.
+            args.insert(0, sys.executable)
+        else:
+            args.insert(0, '-p')
+            args.insert(0, 'run')
+            args.insert(0, 'coverage')
 
         self.execute(args)
 
@@ -123,25 +186,32 @@ class TestCase(unittest.TestCase):
         self.execute(args)
 
     def execute(self, args):
-        print('$ ' + ' '.join(args)) # Print command for debugging.
+        # Successful runs are only printed on demand since the output with debugging enabled
+        # is large, assertOutput includes it anyway when it fails.
+        verbose = str2bool(os.environ.get('OSRT_TEST_VERBOSE', ''))
+        if verbose:
+            print('$ ' + ' '.join(args))
         try:
             env = os.environ
             env['OSC_CONFIG'] = OSCRC
             self.output = subprocess.check_output(args, stderr=subprocess.STDOUT, text=True, env=env)
         except subprocess.CalledProcessError as e:
+            print('$ ' + ' '.join(args))
             print(e.output)
             raise e
-        print(self.output) # For debugging assertion failures.
+        if verbose:
+            print(self.output)
 
     def assertOutput(self, text):
-        self.assertTrue(text in self.output, '[MISSING] ' + text)
+        self.assertIn(text, self.output, '[MISSING] ' + text)
 
     def assertReview(self, rid, **kwargs):
         request = get_request(self.apiurl, rid)
+        missing = object()
         for review in request.reviews:
-            for key, value in kwargs.items():
-                if hasattr(review, key) and getattr(review, key) == value[0]:
-                    self.assertEqual(review.state, value[1], '{}={} not {}'.format(key, value[0], value[1]))
+            for key, (value, state) in kwargs.items():
+                if getattr(review, key, missing) == value:
+                    self.assertEqual(review.state, state, '{}={} not {}'.format(key, value, state))
                     return review
 
         self.fail('{} not found'.format(kwargs))
@@ -162,14 +232,20 @@ class TestCase(unittest.TestCase):
             prefix += '_'
         if not length:
             length = 2
-        return prefix + ''.join([random.choice(string.ascii_letters) for i in range(length)])
+        return prefix + ''.join(random.choices(string.ascii_letters, k=length))
 
 
 class StagingWorkflow(object):
     """This class is intended to setup and manipulate the environment (projects, users, etc.) in
     the local OBS instance used to tests the release tools. It makes easy to setup scenarios similar
     to the ones used during the real (open)SUSE development, with staging projects, rings, etc.
+
+    Everything created through it is deleted by :func:`remove`, which is also called when the
+    workflow is used as a context manager.
     """
+    # attribute types already created in the OBS instance, they outlive any workflow
+    attribute_types = set()
+
     def __init__(self, project=PROJECT):
         """Initializes the configuration
 
@@ -182,14 +258,13 @@ class StagingWorkflow(object):
         THIS_DIR = os.path.dirname(os.path.abspath(__file__))
         oscrc = os.path.join(THIS_DIR, 'test.oscrc')
 
-        # set to None so we return the destructor early in case of exceptions
         self.api = None
         self.apiurl = APIURL
         self.project = project
         self.projects = {}
         self.requests = []
-        self.groups = []
-        self.users = []
+        self.groups = set()
+        self.users = set()
         logging.basicConfig()
 
         # clear cache from other tests - otherwise the VCR is replayed depending
@@ -205,10 +280,7 @@ class StagingWorkflow(object):
             osc.core.conf.config['debug'] = 1
 
         CacheManager.test = True
-        # disable caching, the TTLs break any reproduciblity
-        Cache.CACHE_DIR = None
-        Cache.PATTERNS = {}
-        Cache.init()
+        disable_cache()
         self.setup_remote_config()
         self.load_config()
         self.api = StagingAPI(APIURL, project)
@@ -225,6 +297,9 @@ class StagingWorkflow(object):
         self.config = Config(APIURL, project)
 
     def create_attribute_type(self, namespace, name, values=None):
+        if (namespace, name, values) in self.attribute_types:
+            return
+
         meta = """
         <namespace name='{}'>
             <modifiable_by user='Admin'/>
@@ -238,6 +313,7 @@ class StagingWorkflow(object):
         meta += "<modifiable_by role='maintainer'/></definition>"
         url = osc.core.makeurl(APIURL, ['attribute', namespace, name, '_meta'])
         osc.core.http_PUT(url, data=meta)
+        self.attribute_types.add((namespace, name, values))
 
     def setup_remote_config(self):
         self.create_target()
@@ -272,21 +348,15 @@ class StagingWorkflow(object):
         :param users: list of users to be in group
         :type users: list(str)
         """
-        meta = """
-        <group>
-          <title>{}</title>
-        </group>
-        """.format(name)
-
+        meta = [f'<group><title>{escape(name)}</title>']
         if len(users):
-            root = ET.fromstring(meta)
-            persons = ET.SubElement(root, 'person')
-            for user in users:
-                ET.SubElement(persons, 'person', {'userid': user} )
-            meta = ET.tostring(root)
-
-        if not name in self.groups:
-            self.groups.append(name)
+            meta.append('<person>')
+            meta.extend(f'<person userid={quoteattr(user)}/>' for user in users)
+            meta.append('</person>')
+        meta.append('</group>')
+        meta = ''.join(meta)
+
+        self.groups.add(name)
         url = osc.core.makeurl(APIURL, ['group', name])
         osc.core.http_PUT(url, data=meta)
 
@@ -305,12 +375,12 @@ class StagingWorkflow(object):
         if name in self.users: return
         meta = """
         <person>
-          <login>{}</login>
-          <email>{}@example.com</email>
+          <login>{0}</login>
+          <email>{0}@example.com</email>
           <state>confirmed</state>
         </person>
-        """.format(name, name)
-        self.users.append(name)
+        """.format(escape(name))
+        self.users.add(name)
         url = osc.core.makeurl(APIURL, ['person', name])
         osc.core.http_PUT(url, data=meta)
         url = osc.core.makeurl(APIURL, ['person', name], {'cmd': 'change_password'})
@@ -466,20 +536,16 @@ class StagingWorkflow(object):
 
         return staging
 
-    def __del__(self):
-        if not self.api:
-            return
-        try:
-            self.remove()
-        except:
-            # normally exceptions in destructors are ignored but a info
-            # message is displayed. Make this a little more useful by
-            # printing it into the capture log
-            traceback.print_exc(None, sys.stdout)
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.remove()
 
     def remove(self):
         print('deleting staging workflow')
-        for project in self.projects.values():
+        # The same project can be indexed under several keys (e.g. 'target'), so remove it once.
+        for project in {id(project): project for project in self.projects.values()}.values():
             project.remove()
         for request in self.requests:
             request.revoke()
@@ -548,31 +614,21 @@ class Project(object):
         :param with_repo: whether a repository should be created as part of the meta
         :type with_repo: bool
         """
-        meta = """
-            <project name="{0}">
-              <title></title>
-              <description></description>
-            </project>""".format(self.name)
-
-        root = ET.fromstring(meta)
-        for group in reviewer.get('groups', []):
-            ET.SubElement(root, 'group', { 'groupid': group, 'role': 'reviewer'} )
-        for group in reviewer.get('users', []):
-            ET.SubElement(root, 'person', { 'userid': group, 'role': 'reviewer'} )
-        # TODO: avoid this duplication
-        for group in maintainer.get('groups', []):
-            ET.SubElement(root, 'group', { 'groupid': group, 'role': 'maintainer'} )
-        for group in maintainer.get('users', []):
-            ET.SubElement(root, 'person', { 'userid': group, 'role': 'maintainer'} )
+        meta = [f'<project name={quoteattr(self.name)}><title></title><description></description>']
+        for role, members in (('reviewer', reviewer), ('maintainer', maintainer)):
+            for group in members.get('groups', []):
+                meta.append(f'<group groupid={quoteattr(group)} role="{role}"/>')
+            for user in members.get('users', []):
+                meta.append(f'<person userid={quoteattr(user)} role="{role}"/>')
 
         for link in project_links:
-            ET.SubElement(root, 'link', { 'project': link })
+            meta.append(f'<link project={quoteattr(link)}/>')
 
         if with_repo:
-            repo = ET.SubElement(root, 'repository', { 'name': 'standard' })
-            ET.SubElement(repo, 'arch').text = 'x86_64'
+            meta.append('<repository name="standard"><arch>x86_64</arch></repository>')
 
-        self.custom_meta(ET.tostring(root))
+        meta.append('</project>')
+        self.custom_meta(''.join(meta))
 
     def get_meta(self):
         """Data from the meta section of the project in the OBS instance
@@ -600,23 +656,25 @@ class Project(object):
             'project_links': [],
             'with_repo': False
         }
-        url = osc.core.make_meta_url('prj', self.name, APIURL)
-        data = ET.parse(osc.core.http_GET(url))
-        for child in data.getroot():
-            if child.tag == 'repository':
-                meta['with_repo'] = True
-            elif child.tag == 'link':
-                meta['project_links'].append(child.attrib['project'])
-            elif child.tag == 'group':
-                role = child.attrib['role']
-                if role not in ['reviewer', 'maintainer']:
-                    continue
-                meta[role]['groups'].append(child.attrib['groupid'])
-            elif child.tag == 'person':
-                role = child.attrib['role']
-                if role not in ['reviewer', 'maintainer']:
-                    continue
-                meta[role]['users'].append(child.attrib['userid'])
+
+        def add_role(child, kind, id_attribute):
+            role = child.attrib['role']
+            if role in ['reviewer', 'maintainer']:
+                meta[role][kind].append(child.attrib[id_attribute])
+
+        handlers = {
+            'repository': lambda child: meta.update(with_repo=True),
+            'link': lambda child: meta['project_links'].append(child.attrib['project']),
+            'group': lambda child: add_role(child, 'groups', 'groupid'),
+            'person': lambda child: add_role(child, 'users', 'userid'),
+        }
+
+        url = meta_url('prj', self.name)
+        for _, child in ET.iterparse(osc.core.http_GET(url), events=('end',), tag=list(handlers)):
+            # only the direct children of <project> are relevant
+            if child.getparent().getparent() is None:
+                handlers[child.tag](child)
+            child.clear()
 
         return meta
 
@@ -629,23 +687,24 @@ class Project(object):
         :type groups: list(str)
         """
         meta = self.get_meta()
-        meta['reviewer']['users'] = list(set(meta['reviewer']['users'] + users))
-        meta['reviewer']['groups'] = list(set(meta['reviewer']['groups'] + groups))
+        meta['reviewer']['users'] = list({*meta['reviewer']['users'], *users})
+        meta['reviewer']['groups'] = list({*meta['reviewer']['groups'], *groups})
         self.update_meta(**meta)
 
     def add_package(self, package):
         self.packages.append(package)
 
     def custom_meta(self, meta):
-        url = osc.core.make_meta_url('prj', self.name, APIURL)
+        url = meta_url('prj', self.name)
         osc.core.http_PUT(url, data=meta)
 
     def remove(self):
         if not self.name:
             return
         print('deleting project', self.name)
+        # OBS deletes the packages along with the project
         for package in self.packages:
-            package.remove()
+            package.project = None
 
         url = osc.core.makeurl(APIURL, ['source', self.name], {'force': 1})
         try:
@@ -655,9 +714,6 @@ class Project(object):
                 raise e
         self.name = None
 
-    def __del__(self):
-        self.remove()
-
 class Package(object):
     """This class represents a package in the local OBS instance used to test the release tools and
     offers methods to create and modify such packages in order to simulate the different testing
@@ -682,48 +738,42 @@ class Package(object):
 
         self.name = name
         self.project = project
+        # base URL of the package sources, files are added below it
+        self.source_url = osc.core.makeurl(APIURL, ['source', self.project.name, self.name])
 
-        meta = """
-            <package project="{1}" name="{0}">
-              <title></title>
-              <description></description>
-            </package>""".format(self.name, self.project.name)
-
+        meta = [f'<package project={quoteattr(self.project.name)} name={quoteattr(self.name)}>',
+                '<title></title><description></description>']
         if devel_project:
-            root = ET.fromstring(meta)
-            ET.SubElement(root, 'devel', { 'project': devel_project })
-            meta = ET.tostring(root)
+            meta.append(f'<devel project={quoteattr(devel_project)}/>')
+        meta.append('</package>')
+        meta = ''.join(meta)
 
-        url = osc.core.make_meta_url('pkg', (self.project.name, self.name), APIURL)
+        url = meta_url('pkg', (self.project.name, self.name))
         osc.core.http_PUT(url, data=meta)
         print('created {}/{}'.format(self.project.name, self.name))
         self.project.add_package(self)
 
-    # delete from instance
-    def __del__(self):
-        self.remove()
-
     def create_file(self, filename, data=''):
-        url = osc.core.makeurl(APIURL, ['source', self.project.name, self.name, filename])
-        osc.core.http_PUT(url, data=data)
+        osc.core.http_PUT(self.file_url(filename), data=data)
+
+    def file_url(self, filename):
+        return f'{self.source_url}/{quote(filename)}'
 
     def remove(self):
         if not self.project:
             return
         print('deleting package', self.project.name, self.name)
-        url = osc.core.makeurl(APIURL, ['source', self.project.name, self.name])
         try:
-            osc.core.http_DELETE(url)
+            osc.core.http_DELETE(self.source_url)
         except HTTPError as e:
             if e.code != 404:
                 raise e
         self.project = None
 
     def create_commit(self, text=None, filename='README'):
-        url = osc.core.makeurl(APIURL, ['source', self.project.name, self.name, filename])
         if not text:
-            text = ''.join([random.choice(string.ascii_letters) for i in range(40)])
-        osc.core.http_PUT(url, data=text)
+            text = ''.join(random.choices(string.ascii_letters, k=40))
+        osc.core.http_PUT(self.file_url(filename), data=text)
 
     def commit_files(self, path):
         """Commits to the package the files in the given directory
@@ -765,9 +815,6 @@ class Request(object):
 
         self.revoked = False
 
-    def __del__(self):
-        self.revoke()
-
     def revoke(self):
         if self.revoked: return
         self.change_state('revoked')
@@ -799,4 +846,4 @@ class Request(object):
 
     def xml(self):
         url = osc.core.makeurl(APIURL, ['request', self.reqid])
-        return ET.parse(osc.core.http_GET(url))
+        return ET.fromstring(osc.core.http_GET(url).read()).getroottree()
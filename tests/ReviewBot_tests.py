@@ -12,6 +12,7 @@ class TestReviewBotComment(OBSLocal.TestCase):
         super(TestReviewBotComment, self).setUp()
         self.api = CommentAPI(self.apiurl)
         self.wf = OBSLocal.StagingWorkflow()
+        self.addCleanup(self.wf.remove)
         self.wf.create_user('factory-auto')
         self.project = self.wf.create_project(PROJECT)
 
@@ -26,7 +27,6 @@ class TestReviewBotComment(OBSLocal.TestCase):
         self.api.delete_from(project_name=PROJECT)
         self.assertFalse(len(self.api.get_comments(project_name=PROJECT)))
         self.osc_user('Admin')
-        del self.wf
 
     def test_basic_logger(self):
         comment_count = len(self.api.get_comments(project_name=PROJECT))
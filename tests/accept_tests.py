@@ -14,6 +14,7 @@ class TestAccept(unittest.TestCase):
 
     def setup_wf(self):
         wf = OBSLocal.StagingWorkflow()
+        self.addCleanup(wf.remove)
         wf.setup_rings()
 
         self.c_api = CommentAPI(wf.api.apiurl)
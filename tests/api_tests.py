@@ -18,6 +18,7 @@ class TestApiCalls(OBSLocal.TestCase):
     def setUp(self):
         super(TestApiCalls, self).setUp()
         self.wf = OBSLocal.StagingWorkflow()
+        self.addCleanup(self.wf.remove)
         self.wf.setup_rings()
         self.staging_b = self.wf.create_staging('B')
         prj = self.staging_b.name
@@ -31,10 +32,6 @@ class TestApiCalls(OBSLocal.TestCase):
         self.assertIsNotNone(num)
         self.assertTrue(self.wf.api.item_exists(prj, 'wine'))
 
-    def tearDown(self):
-        del self.wf
-        super(TestApiCalls, self).tearDown()
-
     def test_ring_packages(self):
         """
         Validate the creation of the rings.
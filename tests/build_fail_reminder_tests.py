@@ -5,8 +5,8 @@ class TestBuildFailReminder(OBSLocal.TestCase):
     script = './build-fail-reminder.py'
 
     def test_basic(self):
-        self.wf = OBSLocal.StagingWorkflow()
-        self.wf.create_target()
+        with OBSLocal.StagingWorkflow() as wf:
+            wf.create_target()
 
-        self.execute_script(['--relay', 'smtp', '--sender', 'Tester'])
-        self.assertOutput('loading build fails for openSUSE:Factory')
+            self.execute_script(['--relay', 'smtp', '--sender', 'Tester'])
+            self.assertOutput('loading build fails for openSUSE:Factory')
@@ -25,6 +25,7 @@ class TestCheckSource(OBSLocal.TestCase):
 
         # Using OBSLocal.StagingWorkflow makes it easier to setup testing scenarios
         self.wf = OBSLocal.StagingWorkflow(PROJECT)
+        self.addCleanup(self.wf.remove)
         self.project = self.wf.projects[PROJECT]
 
         # Set up the reviewers team
@@ -49,10 +50,6 @@ class TestCheckSource(OBSLocal.TestCase):
         )
         self.review_bot.bot_name = self.bot_name
 
-    def tearDown(self):
-        super().tearDown()
-        del self.wf
-
     def test_no_devel_project(self):
         """Declines the request when it does not come from a devel project"""
         req_id = self.wf.create_submit_request(SRC_PROJECT, self.randomString('package')).reqid
@@ -24,12 +24,12 @@ class TestCheckCommand(unittest.TestCase):
     def test_check_command_single(self):
         """Validate json conversion for a single project."""
 
-        wf = OBSLocal.StagingWorkflow()
-        wf.create_staging('H')
-        self.checkcommand = CheckCommand(wf.api)
-
-        with open('tests/fixtures/project/staging_projects/openSUSE:Factory/H.xml', encoding='utf-8') as f:
-            xml = etree.fromstring(f.read())
-            wf.api.project_status = MagicMock(return_value=xml)
-        report = self.checkcommand._check_project('openSUSE:Factory:Staging:H')
-        self.assertMultiLineEqual('\n'.join(report).strip(), H_REPORT.strip())
+        with OBSLocal.StagingWorkflow() as wf:
+            wf.create_staging('H')
+            self.checkcommand = CheckCommand(wf.api)
+
+            with open('tests/fixtures/project/staging_projects/openSUSE:Factory/H.xml', encoding='utf-8') as f:
+                xml = etree.fromstring(f.read())
+                wf.api.project_status = MagicMock(return_value=xml)
+            report = self.checkcommand._check_project('openSUSE:Factory:Staging:H')
+            self.assertMultiLineEqual('\n'.join(report).strip(), H_REPORT.strip())
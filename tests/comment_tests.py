@@ -94,6 +94,7 @@ class TestCommentOBS(OBSLocal.TestCase):
     def setUp(self):
         super(TestCommentOBS, self).setUp()
         self.wf = OBSLocal.StagingWorkflow()
+        self.addCleanup(self.wf.remove)
         self.wf.create_user('factory-auto')
         self.wf.create_user('repo-checker')
         self.wf.create_user('staging-bot')
@@ -105,7 +106,6 @@ class TestCommentOBS(OBSLocal.TestCase):
 
     def tearDown(self):
         self.osc_user('Admin')
-        del self.wf
 
     def test_basic(self):
         self.osc_user('staging-bot')
@@ -9,7 +9,9 @@ from . import OBSLocal
 
 class TestConfig(unittest.TestCase):
     def setup_vcr(self):
-        return OBSLocal.StagingWorkflow()
+        wf = OBSLocal.StagingWorkflow()
+        self.addCleanup(wf.remove)
+        return wf
 
     def test_basic(self):
         wf = self.setup_vcr()
@@ -8,6 +8,7 @@ class TestDevelProject(OBSLocal.TestCase):
     def setUp(self):
         super().setUp()
         self.wf = OBSLocal.StagingWorkflow()
+        self.addCleanup(self.wf.remove)
         spa = self.wf.create_project('server:php:applications')
         OBSLocal.Package('drush', project=spa)
         OBSLocal.Package('drush', self.wf.projects['target'], devel_project='server:php:applications')
@@ -18,7 +19,6 @@ class TestDevelProject(OBSLocal.TestCase):
     def tearDown(self):
         super().tearDown()
         self.osc_user('Admin')
-        del self.wf
 
     def test_list(self):
         self.osc_user('staging-bot')
@@ -24,19 +24,18 @@ class TestFreeze(OBSLocal.TestCase):
         return os.path.join(os.getcwd(), 'tests/fixtures')
 
     def test_bootstrap_copy(self):
-        wf = OBSLocal.StagingWorkflow()
+        with OBSLocal.StagingWorkflow() as wf:
+            fc = FreezeCommand(wf.api)
 
-        fc = FreezeCommand(wf.api)
+            fp = self._get_fixture_path('staging-meta-for-bootstrap-copy.xml')
+            fixture = subprocess.check_output('/usr/bin/xmllint --format %s' % fp, shell=True).decode('utf-8')
 
-        fp = self._get_fixture_path('staging-meta-for-bootstrap-copy.xml')
-        fixture = subprocess.check_output('/usr/bin/xmllint --format %s' % fp, shell=True).decode('utf-8')
+            f = tempfile.NamedTemporaryFile(delete=False)
+            f.write(fc.prj_meta_for_bootstrap_copy('openSUSE:Factory:Staging:A'))
+            f.close()
 
-        f = tempfile.NamedTemporaryFile(delete=False)
-        f.write(fc.prj_meta_for_bootstrap_copy('openSUSE:Factory:Staging:A'))
-        f.close()
+            output = subprocess.check_output('/usr/bin/xmllint --format %s' % f.name, shell=True).decode('utf-8')
 
-        output = subprocess.check_output('/usr/bin/xmllint --format %s' % f.name, shell=True).decode('utf-8')
-
-        for line in difflib.unified_diff(fixture.split("\n"), output.split("\n")):
-            print(line)
-        self.assertEqual(output, fixture)
+            for line in difflib.unified_diff(fixture.split("\n"), output.split("\n")):
+                print(line)
+            self.assertEqual(output, fixture)
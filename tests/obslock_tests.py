@@ -120,6 +120,7 @@ class TestOBSLock(unittest.TestCase):
 
     def setup_vcr(self):
         wf = OBSLocal.StagingWorkflow()
+        self.addCleanup(wf.remove)
         wf.create_target()
         # we should most likely create this as part of create_target, but
         # it just slows down all other tests
@@ -29,6 +29,7 @@ class TestOrigin(OBSLocal.TestCase):
 
         self.target_project = self.randomString('target')
         self.wf = OBSLocal.StagingWorkflow(self.target_project)
+        self.addCleanup(self.wf.remove)
 
         self.wf.create_attribute_type('OSRT', 'OriginConfig', 1)
 
@@ -44,10 +45,6 @@ class TestOrigin(OBSLocal.TestCase):
         target = self.wf.create_project(self.target_project)
         target.update_meta(reviewer={'users': [self.bot_user]})
 
-    def tearDown(self):
-        super().tearDown()
-        del self.wf
-
     def remote_config_set_age_minimum(self, minimum=0):
         self.wf.remote_config_set({'originmanager-request-age-min': minimum})
 
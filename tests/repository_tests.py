@@ -12,10 +12,7 @@ class TestRepository(unittest.TestCase):
     def setUp(self):
         super(TestRepository, self).setUp()
         self.wf = OBSLocal.StagingWorkflow()
-
-    def tearDown(self):
-        del self.wf
-        super(TestRepository, self).tearDown()
+        self.addCleanup(self.wf.remove)
 
     def add_project(self, name):
         prj = self.wf.create_project(name)
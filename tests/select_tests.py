@@ -26,10 +26,7 @@ class TestSelect(OBSLocal.TestCase):
         super().setUp()
         super(TestSelect, self).setUp()
         self.wf = OBSLocal.StagingWorkflow()
-
-    def tearDown(self):
-        super(TestSelect, self).tearDown()
-        del self.wf
+        self.addCleanup(self.wf.remove)
 
     def test_old_frozen(self):
         self.wf.api.prj_frozen_enough = MagicMock(return_value=False)